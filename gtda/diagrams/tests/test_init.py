@@ -0,0 +1,13 @@
+"""Testing that all names declared in the __all__ of gtda.diagrams resolve
+to attributes of the module. Guards against silent adjacent-string-literal
+concatenation in the __all__ list, which would make `import *` fail."""
+# License: GNU AGPLv3
+
+import pytest
+
+import gtda.diagrams
+
+
+@pytest.mark.parametrize('name', gtda.diagrams.__all__)
+def test_all_names_resolve(name):
+    assert hasattr(gtda.diagrams, name)
@@ -1,13 +1,21 @@
 import plotly.io as pio
 import numpy as np
+import pytest
 import warnings
 
 from unittest import TestCase
 
+from igraph import Graph
+from numpy.testing import assert_almost_equal
+
 from gtda.mapper import make_mapper_pipeline
 from gtda.mapper import (plot_interactive_mapper_graph,
                          plot_static_mapper_graph)
 from gtda.mapper import FirstSimpleGap
+from gtda.mapper.utils.visualization import (_build_node_elements_csr,
+                                             _fast_kamada_kawai_layout,
+                                             _node_summary_csr,
+                                             get_node_summary)
 
 
 class TestCaseNoTemplate(TestCase):
@@ -60,6 +68,52 @@ class TestStaticPlot(TestCaseNoTemplate):
         assert len(real_colors) == xy.shape[0]
 
 
+def _range_stat(values):
+    return np.max(values) - np.min(values)
+
+
+@pytest.mark.parametrize('summary_stat', [np.mean, np.median, np.max,
+                                          np.min, np.std, _range_stat])
+@pytest.mark.parametrize('n_features', [None, 3])
+def test_node_summary_csr(summary_stat, n_features):
+    """Verify that the CSR-based node summaries -- the numba kernels, the
+    reduceat fast path and the generic fallback, on both 1D and 2D data --
+    agree with the per-node Python loop of get_node_summary."""
+    rng = np.random.RandomState(42)
+    node_elements = [rng.choice(50, size=size, replace=False)
+                     for size in rng.randint(1, 9, size=20)]
+    shape = (50,) if n_features is None else (50, n_features)
+    data = rng.random_sample(shape)
+
+    indices, indptr = _build_node_elements_csr(node_elements)
+    assert_almost_equal(
+        _node_summary_csr(data, indices, indptr, summary_stat),
+        get_node_summary(node_elements, data, summary_stat))
+
+
+class TestFastKamadaKawaiLayout(TestCase):
+
+    def test_path_graph_layout(self):
+        """Verify that the layout of a path graph is finite, of the right
+        shape, and does not blow up along degenerate axes, whose ranges must
+        remain bounded by the range of the dominant axis."""
+        graph = Graph.Ring(30, circular=False)
+        for dim in (2, 3):
+            node_pos = _fast_kamada_kawai_layout(graph, dim, random_state=0)
+            assert node_pos.shape == (graph.vcount(), dim)
+            assert np.all(np.isfinite(node_pos))
+            axis_ranges = np.max(node_pos, axis=0) - np.min(node_pos, axis=0)
+            assert np.max(axis_ranges) <= graph.vcount()
+
+    def test_disconnected_graph_layout(self):
+        """Verify that infinite shortest-path distances between components
+        are handled and produce a finite layout."""
+        graph = Graph.Ring(10, circular=False) + Graph.Ring(5)
+        node_pos = _fast_kamada_kawai_layout(graph, 2, random_state=0)
+        assert node_pos.shape == (graph.vcount(), 2)
+        assert np.all(np.isfinite(node_pos))
+
+
 class TestInteractivePlot(TestCaseNoTemplate):
 
     def _get_widget_by_trait(self, fig, key, val=None):
@@ -0,0 +1,54 @@
+"""Optional numba-accelerated per-node summary statistics, consuming node
+memberships in CSR form. If numba is not installed, the dispatch table is
+empty and callers fall back to the NumPy implementations."""
+# License: GNU AGPLv3
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    numba_summary_kernels = {}
+else:
+    @njit(parallel=True, fastmath=True)
+    def _csr_group_mean(values, indptr):
+        out = np.empty(len(indptr) - 1)
+        for i in prange(len(indptr) - 1):
+            out[i] = np.mean(values[indptr[i]:indptr[i + 1]])
+        return out
+
+    @njit(parallel=True, fastmath=True)
+    def _csr_group_median(values, indptr):
+        out = np.empty(len(indptr) - 1)
+        for i in prange(len(indptr) - 1):
+            out[i] = np.median(values[indptr[i]:indptr[i + 1]])
+        return out
+
+    @njit(parallel=True, fastmath=True)
+    def _csr_group_max(values, indptr):
+        out = np.empty(len(indptr) - 1)
+        for i in prange(len(indptr) - 1):
+            out[i] = np.max(values[indptr[i]:indptr[i + 1]])
+        return out
+
+    @njit(parallel=True, fastmath=True)
+    def _csr_group_min(values, indptr):
+        out = np.empty(len(indptr) - 1)
+        for i in prange(len(indptr) - 1):
+            out[i] = np.min(values[indptr[i]:indptr[i + 1]])
+        return out
+
+    @njit(parallel=True, fastmath=True)
+    def _csr_group_std(values, indptr):
+        out = np.empty(len(indptr) - 1)
+        for i in prange(len(indptr) - 1):
+            out[i] = np.std(values[indptr[i]:indptr[i + 1]])
+        return out
+
+    numba_summary_kernels = {
+        np.mean: _csr_group_mean,
+        np.median: _csr_group_median,
+        np.max: _csr_group_max,
+        np.min: _csr_group_min,
+        np.std: _csr_group_std
+    }
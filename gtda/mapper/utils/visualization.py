@@ -1,13 +1,12 @@
 """Graph layout functions and plotly layout functions."""
 # License: GNU AGPLv3
 
-import operator
-from functools import reduce
-
 import numpy as np
 import plotly.graph_objs as go
 from matplotlib.cm import get_cmap
-from matplotlib.colors import rgb2hex
+from matplotlib.colors import to_hex
+
+from ._stats_numba import numba_summary_kernels
 
 
 def _get_node_size(node_elements):
@@ -15,12 +14,12 @@ def _get_node_size(node_elements):
     return list(map(len, node_elements))
 
 
-def _get_node_text(graph):
+def _get_node_text(node_metadata):
     return [
         f"Node ID:{node_id}<br>Node size:{len(node_elements)}"
         for node_id, node_elements in zip(
-            graph["node_metadata"]["node_id"],
-            graph["node_metadata"]["node_elements"])
+            node_metadata["node_id"],
+            node_metadata["node_elements"])
         ]
 
 
@@ -35,18 +34,112 @@ def get_node_summary(node_elements, data, summary_stat=np.mean):
     )
 
 
+def _build_node_elements_csr(node_elements):
+    """Convert a list of variable-length arrays of sample indices into a pair
+    of CSR-like arrays: the concatenated `indices` and the `indptr` array of
+    offsets delimiting each node's entries in `indices`."""
+    indices = np.concatenate(node_elements)
+    indptr = np.zeros(len(node_elements) + 1, dtype=np.int64)
+    np.cumsum(list(map(len, node_elements)), out=indptr[1:])
+    return indices, indptr
+
+
+def _node_summary_csr(data, indices, indptr, summary_stat=np.mean):
+    """Compute a per-node summary statistic of `data` over the groups of
+    samples described by the CSR arrays `indices` and `indptr`.
+
+    Common statistics (mean, median, max, min, std) on one-dimensional data
+    are dispatched to parallel numba kernels when numba is installed. When
+    `summary_stat` is :func:`numpy.mean`, the summaries for all nodes are
+    otherwise obtained in a single :func:`numpy.add.reduceat` pass instead
+    of one Python-level call per node.
+    """
+    values = data[indices]
+    kernel = numba_summary_kernels.get(summary_stat)
+    if kernel is not None and values.ndim == 1:
+        return kernel(np.ascontiguousarray(values, dtype=np.float64), indptr)
+    if summary_stat is np.mean:
+        sums = np.add.reduceat(values, indptr[:-1], axis=0)
+        counts = np.diff(indptr).astype(np.float64)
+        if values.ndim == 2:
+            sums = sums.sum(axis=1)
+            counts *= values.shape[1]
+        return sums / counts
+    return np.asarray([summary_stat(values[start:stop])
+                       for start, stop in zip(indptr[:-1], indptr[1:])])
+
+
+def _fast_kamada_kawai_layout(graph, dim, n_landmarks=100, random_state=None):
+    """Approximate Kamada-Kawai-style layout via landmark multidimensional
+    scaling on graph shortest-path distances.
+
+    Shortest paths are computed from a random subset of at most `n_landmarks`
+    vertices only, and all vertices are then embedded in `dim` dimensions by
+    triangulation against the landmarks. The cost is O(n_vertices *
+    n_landmarks) instead of the at least quadratic cost of the exact
+    force-directed solver, which makes interactive updates on graphs with
+    thousands of nodes tractable.
+    """
+    n_vertices = graph.vcount()
+    rng = np.random.RandomState(random_state)
+    landmarks = rng.choice(
+        n_vertices, size=min(n_landmarks, n_vertices), replace=False)
+    dist = np.asarray(graph.shortest_paths(source=landmarks.tolist()),
+                      dtype=np.float64)
+    # Place disconnected components at a distance slightly beyond the largest
+    # finite one
+    is_finite = np.isfinite(dist)
+    if not np.all(is_finite):
+        dist[np.logical_not(is_finite)] = \
+            1.5 * np.max(dist[is_finite], initial=1.)
+
+    # Classical multidimensional scaling on the landmark-landmark distances
+    dist_sq = dist ** 2
+    landmarks_dist_sq = dist_sq[:, landmarks]
+    n = len(landmarks)
+    centerer = np.eye(n) - 1. / n
+    eigvals, eigvecs = np.linalg.eigh(
+        -0.5 * centerer @ landmarks_dist_sq @ centerer)
+    top = np.argsort(eigvals)[::-1][:dim]
+    eigvals = eigvals[top]
+    eigvecs = eigvecs[:, top]
+
+    # Triangulate all vertices against the landmark embedding. Components
+    # with numerically zero or negative eigenvalues -- present whenever the
+    # shortest-path metric is nearly embeddable in fewer than `dim`
+    # dimensions, as on chain-like graphs -- are left at zero: dividing by
+    # their near-zero square roots would blow the corresponding coordinates
+    # up to pure numerical noise
+    node_pos = np.zeros((dist.shape[1], dim))
+    significant = eigvals > eigvals[0] * 1e-9
+    node_pos[:, :len(eigvals)][:, significant] = \
+        -0.5 * (dist_sq - landmarks_dist_sq.mean(axis=1)[:, None]).T \
+        @ (eigvecs[:, significant] / np.sqrt(eigvals[significant]))
+    return node_pos
+
+
+def _to_hex_colors(cmap, color_values):
+    """Evaluate a matplotlib colormap on a whole array of color values and
+    convert the resulting RGBA array to a list of hex strings."""
+    return [to_hex(rgba, keep_alpha=False)
+            for rgba in cmap(np.asarray(color_values, dtype=float))]
+
+
 def _get_column_color_buttons(data, is_data_dataframe, node_elements,
                               node_colors_color_variable, colorscale):
     # TODO: Consider opting for just-in-time computation instead of computing
     # all node summary values ahead-of-time. Solution should preserve scroll
     # zoom functionality of 2D static visualisation.
     if is_data_dataframe:
+        data_np = data.to_numpy()
         columns_to_color = data.columns
     else:
+        data_np = np.asarray(data)
         columns_to_color = range(data.shape[1])
 
-    node_color_map = list(map(lambda x: rgb2hex(get_cmap(colorscale)(x)),
-                              node_colors_color_variable))
+    indices, indptr = _build_node_elements_csr(node_elements)
+    cmap = get_cmap(colorscale)
+    node_color_map = _to_hex_colors(cmap, node_colors_color_variable)
 
     column_color_buttons = [
         dict(
@@ -61,14 +154,20 @@ def _get_column_color_buttons(data, is_data_dataframe, node_elements,
         )
     ]
 
-    for column in columns_to_color:
-        if is_data_dataframe:
-            column_values = data[column].to_numpy()
-        else:
-            column_values = data[:, column]
-        node_colors = get_node_summary(node_elements, column_values)
-        node_color_map = list(map(lambda x: rgb2hex(get_cmap(colorscale)(x)),
-                                  node_colors))
+    # A single reduceat pass over the gathered data matrix computes the mean
+    # of every column within every node at once
+    column_sums = np.add.reduceat(data_np[indices], indptr[:-1], axis=0)
+    column_means = column_sums / np.diff(indptr)[:, None]
+    # Normalise each column to [0, 1] for colormap lookup, as is done for the
+    # main color variable
+    column_mins = np.nanmin(column_means, axis=0)
+    column_ptps = np.nanmax(column_means, axis=0) - column_mins
+    column_ptps[column_ptps == 0.] = 1.
+    column_norms = (column_means - column_mins) / column_ptps
+
+    for column_index, column in enumerate(columns_to_color):
+        node_colors = column_norms[:, column_index]
+        node_color_map = _to_hex_colors(cmap, node_colors)
 
         column_color_buttons.append(
             dict(
@@ -107,7 +206,7 @@ def _infer_color_variable_kind(color_variable, data):
     return color_variable_kind
 
 
-def _get_node_colors(data, is_data_dataframe, node_elements,
+def _get_node_colors(data, is_data_dataframe, node_elements_csr,
                      is_node_colors_ndarray, node_color_statistic,
                      color_variable, color_variable_kind):
     """Calculate node colors"""
@@ -133,8 +232,9 @@ def _get_node_colors(data, is_data_dataframe, node_elements,
             else:
                 color_data = data[:, color_variable]
 
-        node_colors = get_node_summary(
-            node_elements, color_data, summary_stat=node_color_statistic)
+        node_colors = _node_summary_csr(
+            np.asarray(color_data), *node_elements_csr,
+            summary_stat=node_color_statistic)
 
     # Check if node_colors contains NaNs
     if any(np.logical_not(np.isfinite(node_colors))):
@@ -149,11 +249,16 @@ def _get_node_colors(data, is_data_dataframe, node_elements,
     return node_colors
 
 
-def _calculate_graph_data(
+def _calculate_graph_arrays(
         pipeline, data, layout, layout_dim,
-        color_variable, node_color_statistic, plotly_kwargs):
+        color_variable, node_color_statistic, colorscale='viridis'):
+    """Compute the Mapper graph of `data` and return the plain arrays
+    (coordinates, colors, sizes and hovertexts) needed to populate or update
+    the traces of a plotly figure, without constructing any plotly object."""
     graph = pipeline.fit_transform(data)
-    node_elements = graph['node_metadata']['node_elements']
+    node_metadata = graph['node_metadata']
+    node_elements = node_metadata['node_elements']
+    node_elements_csr = _build_node_elements_csr(node_elements)
 
     # Simple duck typing to determine whether data is a pandas dataframe
     is_data_dataframe = hasattr(data, 'columns')
@@ -162,6 +267,8 @@ def _calculate_graph_data(
     is_layout_ndarray = hasattr(layout, 'dtype')
     if is_layout_ndarray:
         node_pos = layout
+    elif layout == 'kamada_kawai_fast':
+        node_pos = _fast_kamada_kawai_layout(graph, layout_dim)
     else:
         node_pos = graph.layout(layout, dim=layout_dim)
 
@@ -173,37 +280,88 @@ def _calculate_graph_data(
         raise ValueError("node_color_statistic must be a callable or ndarray.")
 
     node_colors = _get_node_colors(
-        data, is_data_dataframe, node_elements,
+        data, is_data_dataframe, node_elements_csr,
         is_node_colors_ndarray, node_color_statistic,
         color_variable, color_variable_kind)
 
+    # Evaluate the colormap on all node colors at once and convert to hex
+    # once, instead of one colormap lookup per node per usage
+    node_colors_hex = _to_hex_colors(get_cmap(colorscale), node_colors)
+
+    # Assemble edge coordinates as interleaved [start, end, break] segments in
+    # a single vectorised pass, with NaN playing the role of None as the
+    # line-break marker recognised by plotly
+    edges = np.asarray(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    node_pos_arr = np.asarray(
+        node_pos.coords if hasattr(node_pos, 'coords') else node_pos,
+        dtype=np.float64)
+    edge_pos_arr = np.empty((3 * len(edges), layout_dim), dtype=np.float64)
+    edge_pos_arr[0::3] = node_pos_arr[edges[:, 0]]
+    edge_pos_arr[1::3] = node_pos_arr[edges[:, 1]]
+    edge_pos_arr[2::3] = np.nan
+
+    graph_arrays = {
+        'node_elements': node_elements,
+        'node_elements_csr': node_elements_csr,
+        'node_colors': node_colors,
+        'node_colors_hex': node_colors_hex,
+        'node_text': _get_node_text(node_metadata),
+        'node_size': _get_node_size(node_elements),
+        'node_sizeref': set_node_sizeref(node_elements),
+        'node_cmin': np.min(node_colors),
+        'node_cmax': np.max(node_colors),
+        'edge_x': edge_pos_arr[:, 0].tolist(),
+        'edge_y': edge_pos_arr[:, 1].tolist(),
+        'node_x': node_pos_arr[:, 0].tolist(),
+        'node_y': node_pos_arr[:, 1].tolist()
+    }
+
+    if layout_dim == 3:
+        graph_arrays['edge_z'] = edge_pos_arr[:, 2].tolist()
+        graph_arrays['node_z'] = node_pos_arr[:, 2].tolist()
+
+    return graph_arrays
+
+
+def _calculate_graph_data(
+        pipeline, data, layout, layout_dim,
+        color_variable, node_color_statistic, plotly_kwargs):
+    colorscale = 'viridis'
+    if plotly_kwargs is not None:
+        colorscale = plotly_kwargs.get(
+            'node_trace_marker_colorscale', colorscale)
+
+    graph_arrays = _calculate_graph_arrays(
+        pipeline, data, layout, layout_dim,
+        color_variable, node_color_statistic, colorscale=colorscale)
+    node_elements = graph_arrays['node_elements']
+    node_colors = graph_arrays['node_colors']
+    node_colors_hex = graph_arrays['node_colors_hex']
+
     plot_options = {
         'edge_trace_mode': 'lines',
         'edge_trace_line': dict(color='#888', width=1),
         'edge_trace_hoverinfo': 'none',
         'node_trace_mode': 'markers',
         'node_trace_hoverinfo': 'text',
-        'node_trace_hoverlabel': dict(
-            bgcolor=list(map(lambda x: rgb2hex(get_cmap('viridis')(x)),
-                             node_colors))),
-        'node_trace_marker_color': list(
-            map(lambda x: rgb2hex(get_cmap('viridis')(x)), node_colors)),
-        'node_trace_marker_colorscale': 'viridis',
+        'node_trace_hoverlabel': dict(bgcolor=node_colors_hex),
+        'node_trace_marker_color': node_colors_hex,
+        'node_trace_marker_colorscale': colorscale,
         'node_trace_marker_showscale': True,
         'node_trace_marker_reversescale': False,
         'node_trace_marker_line': dict(width=.5, color='#888'),
-        'node_trace_marker_size': _get_node_size(node_elements),
+        'node_trace_marker_size': graph_arrays['node_size'],
         'node_trace_marker_sizemode': 'area',
-        'node_trace_marker_sizeref': set_node_sizeref(node_elements),
+        'node_trace_marker_sizeref': graph_arrays['node_sizeref'],
         'node_trace_marker_sizemin': 4,
-        'node_trace_marker_cmin': np.min(node_colors),
-        'node_trace_marker_cmax': np.max(node_colors),
+        'node_trace_marker_cmin': graph_arrays['node_cmin'],
+        'node_trace_marker_cmax': graph_arrays['node_cmax'],
         'node_trace_marker_colorbar': dict(thickness=15,
                                            title='',
                                            xanchor='left',
                                            titleside='right'),
         'node_trace_marker_line_width': 2,
-        'node_trace_text': _get_node_text(graph),
+        'node_trace_text': graph_arrays['node_text'],
         'layout_showlegend': False,
         'layout_hovermode': 'closest',
         'layout_xaxis_title': "",
@@ -216,17 +374,36 @@ def _calculate_graph_data(
     if plotly_kwargs is not None:
         plot_options.update(plotly_kwargs)
 
-    edge_x = list(reduce(operator.iconcat,
-                         map(lambda x: [node_pos[x[0]][0],
-                                        node_pos[x[1]][0], None],
-                             graph.get_edgelist()), []))
-    edge_y = list(reduce(operator.iconcat,
-                         map(lambda x: [node_pos[x[0]][1],
-                                        node_pos[x[1]][1], None],
-                             graph.get_edgelist()), []))
-
-    node_x = [node_pos[k][0] for k in range(graph.vcount())]
-    node_y = [node_pos[k][1] for k in range(graph.vcount())]
+    # Construct the trace keyword arguments once, reading each plot option a
+    # single time, and share them between the 2D and 3D branches
+    edge_trace_kwargs = dict(
+        x=graph_arrays['edge_x'],
+        y=graph_arrays['edge_y'],
+        mode=plot_options['edge_trace_mode'],
+        line=plot_options['edge_trace_line'],
+        hoverinfo=plot_options['edge_trace_hoverinfo'])
+
+    node_trace_kwargs = dict(
+        x=graph_arrays['node_x'],
+        y=graph_arrays['node_y'],
+        mode=plot_options['node_trace_mode'],
+        hoverinfo=plot_options['node_trace_hoverinfo'],
+        hovertext=plot_options['node_trace_text'],
+        marker=dict(
+            showscale=plot_options['node_trace_marker_showscale'],
+            colorscale=plot_options['node_trace_marker_colorscale'],
+            reversescale=plot_options['node_trace_marker_reversescale'],
+            line=plot_options['node_trace_marker_line'],
+            color=plot_options['node_trace_marker_color'],
+            size=plot_options['node_trace_marker_size'],
+            sizemode=plot_options['node_trace_marker_sizemode'],
+            sizeref=plot_options['node_trace_marker_sizeref'],
+            sizemin=plot_options['node_trace_marker_sizemin'],
+            cmin=plot_options['node_trace_marker_cmin'],
+            cmax=plot_options['node_trace_marker_cmax'],
+            colorbar=plot_options['node_trace_marker_colorbar'],
+            line_width=plot_options['node_trace_marker_line_width']),
+        text=plot_options['node_trace_text'])
 
     if layout_dim == 2:
         plot_options.update({
@@ -237,91 +414,25 @@ def _calculate_graph_data(
                                  showticklabels=False, ticks="",
                                  showline=False),
         })
-        edge_trace = go.Scatter(
-            x=edge_x,
-            y=edge_y,
-            line=plot_options['edge_trace_line'],
-            hoverinfo=plot_options['edge_trace_hoverinfo'],
-            mode=plot_options['edge_trace_mode'])
-
-        node_trace = go.Scatter(
-            x=node_x,
-            y=node_y,
-            mode=plot_options['node_trace_mode'],
-            hoverinfo=plot_options['node_trace_hoverinfo'],
-            hovertext=plot_options['node_trace_text'],
-            marker=dict(
-                showscale=plot_options['node_trace_marker_showscale'],
-                colorscale=plot_options['node_trace_marker_colorscale'],
-                reversescale=plot_options['node_trace_marker_reversescale'],
-                line=plot_options['node_trace_marker_line'],
-                color=list(
-                    map(lambda x: rgb2hex(
-                        get_cmap(
-                            plot_options['node_trace_marker_colorscale']
-                        )(x)), node_colors)),
-                size=plot_options['node_trace_marker_size'],
-                sizemode=plot_options['node_trace_marker_sizemode'],
-                sizeref=plot_options['node_trace_marker_sizeref'],
-                sizemin=plot_options['node_trace_marker_sizemin'],
-                cmin=plot_options['node_trace_marker_cmin'],
-                cmax=plot_options['node_trace_marker_cmax'],
-                colorbar=plot_options['node_trace_marker_colorbar'],
-                line_width=plot_options['node_trace_marker_line_width']),
-            text=plot_options['node_trace_text'])
+        edge_trace = go.Scatter(**edge_trace_kwargs)
+        node_trace = go.Scatter(**node_trace_kwargs)
     elif layout_dim == 3:
-        plot_options.update({
-            'axis': dict(showbackground=False,
-                            showline=False,
-                            zeroline=False,
-                            showgrid=False,
-                            showticklabels=False,
-                            title='')
-        })
-        plot_options['layout_scene'] = dict(xaxis=dict(plot_options['axis']),
-                                            yaxis=dict(
-                                                plot_options['axis']),
-                                            zaxis=dict(
-                                                plot_options['axis'])
-                                            )
-
-        edge_z = list(reduce(operator.iconcat,
-                             map(lambda x: [node_pos[x[0]][2],
-                                            node_pos[x[1]][2], None],
-                                 graph.get_edgelist()), []))
-
-        node_z = [node_pos[k][2] for k in range(graph.vcount())]
-
-        edge_trace = go.Scatter3d(
-            x=edge_x,
-            y=edge_y,
-            z=edge_z,
-            mode=plot_options['edge_trace_mode'],
-            line=plot_options['edge_trace_line'],
-            hoverinfo=plot_options['edge_trace_hoverinfo'])
-
+        axis = dict(showbackground=False,
+                    showline=False,
+                    zeroline=False,
+                    showgrid=False,
+                    showticklabels=False,
+                    title='')
+        plot_options['axis'] = axis
+        plot_options['layout_scene'] = dict(xaxis=dict(axis),
+                                            yaxis=dict(axis),
+                                            zaxis=dict(axis))
+
+        edge_trace = go.Scatter3d(z=graph_arrays['edge_z'],
+                                  **edge_trace_kwargs)
         node_trace = go.Scatter3d(
-            x=node_x,
-            y=node_y,
-            z=node_z,
-            mode=plot_options['node_trace_mode'],
-            hoverinfo=plot_options['node_trace_hoverinfo'],
+            z=graph_arrays['node_z'],
             hoverlabel=plot_options['node_trace_hoverlabel'],
-            hovertext=plot_options['node_trace_text'],
-            marker=dict(
-                showscale=plot_options['node_trace_marker_showscale'],
-                colorscale=plot_options['node_trace_marker_colorscale'],
-                reversescale=plot_options['node_trace_marker_reversescale'],
-                line=plot_options['node_trace_marker_line'],
-                color=plot_options['node_trace_marker_color'],
-                size=plot_options['node_trace_marker_size'],
-                sizemode=plot_options['node_trace_marker_sizemode'],
-                sizeref=plot_options['node_trace_marker_sizeref'],
-                sizemin=plot_options['node_trace_marker_sizemin'],
-                cmin=plot_options['node_trace_marker_cmin'],
-                cmax=plot_options['node_trace_marker_cmax'],
-                colorbar=plot_options['node_trace_marker_colorbar'],
-                line_width=plot_options['node_trace_marker_line_width']),
-            text=plot_options['node_trace_text'])
+            **node_trace_kwargs)
 
     return node_trace, edge_trace, node_elements, node_colors, plot_options
@@ -1,18 +1,46 @@
 """Static and interactive visualisation functions for Mapper graphs."""
 # License: GNU AGPLv3
 
+import atexit
 import logging
 import traceback
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Timer
 
 import numpy as np
 import plotly.graph_objects as go
 from ipywidgets import Layout, widgets
+from joblib import Memory
 from sklearn.base import clone
 
 from .utils._logging import OutputWidgetHandler
-from .utils.visualization import (_calculate_graph_data,
+from .utils.visualization import (_calculate_graph_arrays,
+                                  _calculate_graph_data,
                                   _get_column_color_buttons)
 
+_step_cache_bytes_limit = '512M'
+_step_cache_dir = None
+
+
+def _get_step_cache_memory():
+    """joblib Memory on a single per-process temporary directory, shared by
+    all interactive plots and removed at interpreter exit."""
+    global _step_cache_dir
+    if _step_cache_dir is None:
+        _step_cache_dir = mkdtemp(prefix='gtda-mapper-cache-')
+        atexit.register(rmtree, _step_cache_dir, ignore_errors=True)
+    return Memory(_step_cache_dir, verbose=0)
+
+
+def _reduce_step_cache(memory):
+    try:
+        memory.reduce_size(bytes_limit=_step_cache_bytes_limit)
+    except TypeError:
+        # Older joblib versions take the limit from a Memory attribute
+        memory.bytes_limit = _step_cache_bytes_limit
+        memory.reduce_size()
+
 
 def plot_static_mapper_graph(
         pipeline, data, layout='kamada_kawai', layout_dim=2,
@@ -36,7 +64,10 @@ def plot_static_mapper_graph(
     layout : None, str or callable, optional, default: ``'kamada-kawai'``
         Layout algorithm for the graph. Can be any accepted value for the
         ``layout`` parameter in the :meth:`layout` method of
-        :class:`igraph.Graph`. [1]_
+        :class:`igraph.Graph`. [1]_ The additional value
+        ``'kamada_kawai_fast'`` selects a fast landmark-based approximation
+        of the Kamada-Kawai layout, recommended for graphs with thousands
+        of nodes.
 
     layout_dim : int, default: ``2``
         The number of dimensions for the layout. Can be 2 or 3.
@@ -92,9 +123,12 @@ def plot_static_mapper_graph(
 
     """
 
-    # Compute the graph and fetch the indices of points in each node
-    if clone_pipeline:
+    # Compute the graph and fetch the indices of points in each node. Skip
+    # cloning when the pipeline is itself a just-created clone, as flagged by
+    # the sentinel attribute set below
+    if clone_pipeline and not getattr(pipeline, '_gtda_fresh', False):
         pipe = clone(pipeline)
+        pipe._gtda_fresh = True
     else:
         pipe = pipeline
 
@@ -184,6 +218,12 @@ def plot_interactive_mapper_graph(pipeline, data, layout='kamada_kawai',
     according to :attr:`color_variable`. By default, the hovertext displays a
     globally unique ID and the number of elements associated with a given node.
 
+    Unless `pipeline` sets its own ``memory`` parameter, fitted pipeline
+    steps are cached on disk across parameter updates in a temporary
+    per-process directory, so that e.g. changing only clustering parameters
+    does not recompute the cover. The cache is trimmed to a fixed size after
+    each update and the directory is removed when the Python process exits.
+
     Parameters
     ----------
     pipeline : :class:`~gtda.mapper.pipeline.MapperPipeline` object
@@ -195,7 +235,10 @@ def plot_interactive_mapper_graph(pipeline, data, layout='kamada_kawai',
     layout : None, str or callable, optional, default: ``'kamada-kawai'``
         Layout algorithm for the graph. Can be any accepted value for the
         ``layout`` parameter in the :meth:`layout` method of
-        :class:`igraph.Graph`. [1]_
+        :class:`igraph.Graph`. [1]_ The additional value
+        ``'kamada_kawai_fast'`` selects a fast landmark-based approximation
+        of the Kamada-Kawai layout, recommended for graphs with thousands
+        of nodes.
 
     layout_dim : int, default: ``2``
         The number of dimensions for the layout. Can be 2 or 3.
@@ -249,6 +292,15 @@ def plot_interactive_mapper_graph(pipeline, data, layout='kamada_kawai',
 
     # clone pipeline to avoid side effects from in-place parameter changes
     pipe = clone(pipeline)
+    pipe._gtda_fresh = True
+
+    # Cache the fitted pipeline steps across interactive updates, so that
+    # e.g. changing only clustering parameters does not recompute the
+    # scaler -> filter_func -> cover steps on unchanged data
+    cache_memory = None
+    if pipe.get_mapper_params()['memory'] is None:
+        cache_memory = _get_step_cache_memory()
+        pipe.set_params(memory=cache_memory)
 
     if node_color_statistic is not None:
         _node_color_statistic = node_color_statistic
@@ -282,23 +334,23 @@ def plot_interactive_mapper_graph(pipeline, data, layout='kamada_kawai',
         else:
             return None
 
-    def update_figure(figure, edge_trace, node_trace, layout_dim):
-        figure.data[0].x = edge_trace.x
-        figure.data[0].y = edge_trace.y
-        figure.data[1].x = node_trace.x
-        figure.data[1].y = node_trace.y
+    def update_figure(figure, graph_arrays, layout_dim):
+        figure.data[0].x = graph_arrays['edge_x']
+        figure.data[0].y = graph_arrays['edge_y']
+        figure.data[1].x = graph_arrays['node_x']
+        figure.data[1].y = graph_arrays['node_y']
 
         if layout_dim == 3:
-            figure.data[0].z = edge_trace.z
-            figure.data[1].z = node_trace.z
+            figure.data[0].z = graph_arrays['edge_z']
+            figure.data[1].z = graph_arrays['node_z']
 
-        figure.data[1].marker.size = node_trace.marker.size
-        figure.data[1].marker.color = node_trace.marker.color
-        figure.data[1].marker.cmin = node_trace.marker.cmin
-        figure.data[1].marker.cmax = node_trace.marker.cmax
-        figure.data[1].marker.sizeref = node_trace.marker.sizeref
-        figure.data[1].hoverlabel = node_trace.hoverlabel
-        figure.data[1].hovertext = node_trace.hovertext
+        figure.data[1].marker.size = graph_arrays['node_size']
+        figure.data[1].marker.color = graph_arrays['node_colors_hex']
+        figure.data[1].marker.cmin = graph_arrays['node_cmin']
+        figure.data[1].marker.cmax = graph_arrays['node_cmax']
+        figure.data[1].marker.sizeref = graph_arrays['node_sizeref']
+        figure.data[1].hoverlabel.bgcolor = graph_arrays['node_colors_hex']
+        figure.data[1].hovertext = graph_arrays['node_text']
 
     def on_parameter_change(change):
         handler.clear_logs()
@@ -313,20 +365,22 @@ def plot_interactive_mapper_graph(pipeline, data, layout='kamada_kawai',
                         **{param: cluster_params_widgets[param].value})
 
             logger.info("Updating figure ...")
+            # Recompute only the trace arrays and write them into the
+            # existing figure, instead of rebuilding it from scratch
+            graph_arrays = _calculate_graph_arrays(
+                pipe, data, layout, layout_dim,
+                color_variable, _node_color_statistic,
+                colorscale=colorscale)
             with fig.batch_update():
-                (node_trace, edge_trace, node_elements, node_colors,
-                 plot_options) = _calculate_graph_data(
-                    pipe, data, layout, layout_dim,
-                    color_variable, _node_color_statistic, plotly_kwargs
-                )
-                update_figure(fig, edge_trace, node_trace, layout_dim)
+                update_figure(fig, graph_arrays, layout_dim)
 
                 # Update color by column buttons
                 is_data_dataframe = hasattr(data, 'columns')
                 if color_by_columns_dropdown:
                     column_color_buttons = _get_column_color_buttons(
-                        data, is_data_dataframe, node_elements, node_colors,
-                        plot_options['node_trace_marker_colorscale'])
+                        data, is_data_dataframe,
+                        graph_arrays['node_elements'],
+                        graph_arrays['node_colors'], colorscale)
                 else:
                     column_color_buttons = None
 
@@ -346,15 +400,34 @@ def plot_interactive_mapper_graph(pipeline, data, layout='kamada_kawai',
                     ])
 
             valid.value = True
+            if cache_memory is not None:
+                _reduce_step_cache(cache_memory)
         except Exception:
             exception_data = traceback.format_exc().splitlines()
             logger.exception(exception_data[-1])
             valid.value = False
 
+    def debounce(callback, wait=0.15):
+        """Collapse rapid successive invocations of `callback` into a single
+        call `wait` seconds after the last one, so that editing several
+        parameter widgets in a row triggers one Mapper recomputation on the
+        final state instead of one per widget."""
+        timer = None
+
+        def debounced(change):
+            nonlocal timer
+            if timer is not None:
+                timer.cancel()
+            timer = Timer(wait, callback, args=(change,))
+            timer.start()
+
+        return debounced
+
     def observe_widgets(params, widgets):
         for param, value in params.items():
             if isinstance(value, (int, float, str)):
-                widgets[param].observe(on_parameter_change, names='value')
+                widgets[param].observe(debounced_on_parameter_change,
+                                       names='value')
 
     # define output widget to capture logs
     out = widgets.Output()
@@ -404,11 +477,16 @@ def plot_interactive_mapper_graph(pipeline, data, layout='kamada_kawai',
     # initialise figure with initial pipeline and config
     if plotly_kwargs is None:
         plotly_kwargs = dict()
+    colorscale = plotly_kwargs.get('node_trace_marker_colorscale', 'viridis')
 
     fig = plot_static_mapper_graph(
         pipe, data, layout, layout_dim, color_variable, _node_color_statistic,
         color_by_columns_dropdown, plotly_kwargs, clone_pipeline=False)
 
+    # share one debounced callback across all widgets so that edits to
+    # different fields are coalesced too
+    debounced_on_parameter_change = debounce(on_parameter_change)
+
     observe_widgets(cover_params, cover_params_widgets)
     observe_widgets(cluster_params, cluster_params_widgets)
 